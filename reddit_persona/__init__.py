@@ -1,7 +1,7 @@
  
 from reddit_persona.config import RedditConfig, LLMConfig
 from reddit_persona.data_collection import DataCollection
-import json
+from reddit_persona.data_collection import loads
 import os
 from reddit_persona.non_llm_analytics import NonLLMAnalysis
 from reddit_persona.llm_analytics import LlmManager
@@ -37,8 +37,8 @@ def is_json_file_present(file_path):
 def load_json(filepath):
     try:
         if(is_json_file_present(file_path= filepath)):
-            with open(filepath,"r") as f:
-                reddit_data = json.load(f)
+            with open(filepath,"rb") as f:
+                reddit_data = loads(f.read())
             return reddit_data
         else:
             raise FileNotFoundError(f"No file found at: {filepath}")
@@ -55,8 +55,7 @@ def run():
     config = RedditConfig(r'utils\defaultconfig.yaml')
     config.display_config()
     datacollection = DataCollection(reddit_client_id=config.get('REDDIT_CLIENT_ID'),reddit_client_secret=config.get('REDDIT_CLIENT_SECRET'),reddit_user_agent=config.get('REDDIT_USER_AGENT'))
-    filename,folder_path = datacollection.generate_reddit_user_json(user_input)
-    reddit_data = load_json(filename)
+    reddit_data,filename,folder_path = datacollection.generate_reddit_user_json(user_input)
     nonllmanalysis = NonLLMAnalysis(reddit_data=reddit_data)
     analysis = nonllmanalysis.run_analysis()
     new_data = analysis['reddit_data']
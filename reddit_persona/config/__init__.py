@@ -1,5 +1,51 @@
 import yaml
 import os
+import re
+from itertools import islice
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+
+# A line that opens a new top-level mapping key, which cannot continue a value from the line before it
+_TOP_LEVEL_KEY_RE = re.compile(r"""(?:"[^"\n]*"|'[^'\n]*'|[^\s#'"?:,\[\]{}&*!|>%@`-][^:\n]*)[ \t]*:(?:[ \t]|$)""", re.MULTILINE)
+
+
+def _load_yaml_fields(yaml_path, fields, max_lines=32):
+    """
+    Loads a YAML mapping, parsing only its first lines when they already contain every field.
+    
+    The header is only trusted when the line after it starts a new top-level key, so that it
+    never ends inside a multi-line value, and when no field is redefined further down.
+    
+    Args:
+        yaml_path (str): Path to the YAML file.
+        fields (list): Keys that must be present for the header to be sufficient.
+        max_lines (int): Number of leading lines to try first.
+    
+    Returns:
+        dict: The parsed YAML data, or an empty dict for an empty file.
+    """
+    with open(yaml_path, 'r') as file:
+        head = "".join(islice(file, max_lines))
+        rest = file.read()
+    if not rest:
+        # The header is the whole file
+        return yaml.load(head, Loader=_SafeLoader) or {}
+    redefined = re.compile(
+        r"""^["']?(?:%s)["']?[ \t]*:""" % "|".join(re.escape(field) for field in fields),
+        re.MULTILINE
+    )
+    if _TOP_LEVEL_KEY_RE.match(rest) and not redefined.search(rest):
+        try:
+            config_data = yaml.load(head, Loader=_SafeLoader)
+        except yaml.YAMLError:
+            config_data = None
+        if isinstance(config_data, dict) and all(field in config_data for field in fields):
+            return config_data
+    return yaml.load(head + rest, Loader=_SafeLoader) or {}
 
 class RedditConfig:
     """Class to manage predefined API configuration values."""
@@ -11,6 +57,9 @@ class RedditConfig:
         "REDDIT_USER_AGENT",
     ]
 
+    # Each field is stored as a lowercase slot attribute instead of a per-instance dict
+    __slots__ = tuple(field.lower() for field in CONFIG_FIELDS)
+
     def __init__(self, yaml_path=None, **kwargs):
         """
         Initializes the configuration, either from a YAML file or provided arguments.
@@ -19,15 +68,18 @@ class RedditConfig:
             yaml_path (str, optional): Path to the YAML configuration file.
             kwargs (dict): Additional configuration fields as key-value pairs.
         """
-        # Initialize the configuration as an empty dictionary
-        self.config = {field: None for field in self.CONFIG_FIELDS}
+        # Initialize every configuration field as unset
+        for field in self.CONFIG_FIELDS:
+            setattr(self, field.lower(), None)
 
         # If a YAML path is provided, load the configurations from there
         if yaml_path:
             self.load_from_yaml(yaml_path)
 
-        # If any keyword arguments are provided, populate them into the config dictionary
-        self.config.update(kwargs)
+        # If any keyword arguments are provided, populate the matching configuration fields
+        for field, value in kwargs.items():
+            if field in self.CONFIG_FIELDS:
+                setattr(self, field.lower(), value)
 
         # If any configuration values are missing, prompt the user for input
         self.load_from_input()
@@ -35,13 +87,12 @@ class RedditConfig:
     def load_from_yaml(self, yaml_path):
         """Loads configuration from a YAML file."""
         try:
-            with open(yaml_path, 'r') as file:
-                config_data = yaml.safe_load(file)
-                # Only update the fixed fields, leaving others intact
+            config_data = _load_yaml_fields(yaml_path, self.CONFIG_FIELDS)
+            # Only update the fixed fields, leaving others intact
 
-                for field in self.CONFIG_FIELDS:
-                    if  field in config_data:
-                        self.config[field] = config_data[field]
+            for field in self.CONFIG_FIELDS:
+                if  field in config_data:
+                    setattr(self, field.lower(), config_data[field])
         except FileNotFoundError:
             print(f"Error: The file at {yaml_path} was not found.")
         except yaml.YAMLError as e:
@@ -54,8 +105,8 @@ class RedditConfig:
         """
         for field_name in self.CONFIG_FIELDS:
             # If the field is not already set, prompt the user for input
-            if self.config[field_name] is None :
-                self.config[field_name] = self.ask_user_input(field_name)
+            if getattr(self, field_name.lower()) is None :
+                setattr(self, field_name.lower(), self.ask_user_input(field_name))
 
     def ask_user_input(self, field_name):
         """
@@ -67,7 +118,7 @@ class RedditConfig:
         Returns:
             str: The user input value.
         """
-        current_value = self.config.get(field_name)
+        current_value = getattr(self, field_name.lower(), None)
 
         # If the field already has a value, ask if the user wants to keep it
         if current_value:
@@ -80,12 +131,18 @@ class RedditConfig:
         # If the user does not want to keep the existing value, ask for new input
         return input(f"Please enter the value for {field_name}: ").strip()
 
+    @property
+    def config(self):
+        """The current configuration as a dictionary keyed by field name."""
+        return {field: getattr(self, field.lower()) for field in self.CONFIG_FIELDS}
+
     def display_config(self):
         """Returns the current configuration as a dictionary."""
         print("Displaying Config...")
-        for k in self.config.keys():
-            print(f"{k} : {self.config[k]}")
-        return self.config
+        config = self.config
+        for k in config.keys():
+            print(f"{k} : {config[k]}")
+        return config
 
     def get(self, field_name):
         """
@@ -99,7 +156,7 @@ class RedditConfig:
         """
         # Check if the field is in the predefined config fields
         if field_name in self.CONFIG_FIELDS:
-            return self.config.get(field_name)
+            return getattr(self, field_name.lower(), None)
         else:
             print(f"Error: '{field_name}' is not a valid configuration field.")
             return None
@@ -116,6 +173,8 @@ class LLMConfig:
         "MODEL_ID"
     ]
 
+    __slots__ = tuple(field.lower() for field in CONFIG_FIELDS)
+
     def __init__(self, hf_token=None, model_id=None, yaml_path=None):
         """
         Initialize config either from direct input, a YAML file, or environment variables.
@@ -125,13 +184,9 @@ class LLMConfig:
             model_id (str, optional): Model ID to use (e.g., 'mistralai/Mistral-7B-Instruct-v0.1').
             yaml_path (str, optional): Path to YAML file with config fields.
         """
-        self.config = {field: None for field in self.CONFIG_FIELDS}
-
         # Priority 1: Direct arguments
-        if hf_token:
-            self.config["HF_TOKEN"] = hf_token
-        if model_id:
-            self.config["MODEL_ID"] = model_id
+        self.hf_token = hf_token or None
+        self.model_id = model_id or None
 
         # Priority 2: YAML file
         if yaml_path:
@@ -139,8 +194,8 @@ class LLMConfig:
 
         # Priority 3: Environment variables
         for field in self.CONFIG_FIELDS:
-            if self.config[field] is None:
-                self.config[field] = os.getenv(field)
+            if getattr(self, field.lower()) is None:
+                setattr(self, field.lower(), os.getenv(field))
 
         # Priority 4: Prompt user
         self.load_from_input()
@@ -148,11 +203,10 @@ class LLMConfig:
     def load_from_yaml(self, yaml_path):
         """Load configuration from a YAML file."""
         try:
-            with open(yaml_path, 'r') as file:
-                config_data = yaml.safe_load(file)
-                for field in self.CONFIG_FIELDS:
-                    if field in config_data:
-                        self.config[field] = config_data[field]
+            config_data = _load_yaml_fields(yaml_path, self.CONFIG_FIELDS)
+            for field in self.CONFIG_FIELDS:
+                if field in config_data:
+                    setattr(self, field.lower(), config_data[field])
         except FileNotFoundError:
             print(f"❌ Error: The file at {yaml_path} was not found.")
         except yaml.YAMLError as e:
@@ -161,24 +215,30 @@ class LLMConfig:
     def load_from_input(self):
         """Prompt user for any missing fields."""
         for field in self.CONFIG_FIELDS:
-            if not self.config.get(field):
-                self.config[field] = self.ask_user_input(field)
+            if not getattr(self, field.lower()):
+                setattr(self, field.lower(), self.ask_user_input(field))
 
     def ask_user_input(self, field_name):
         """Ask user to enter the value for a missing field."""
         return input(f"Please enter the value for {field_name}: ").strip()
 
+    @property
+    def config(self):
+        """Current configuration as a dictionary keyed by field name."""
+        return {field: getattr(self, field.lower()) for field in self.CONFIG_FIELDS}
+
     def display_config(self):
         """Display and return current configuration."""
+        config = self.config
         print("🔧 LLM Configuration:")
-        for k, v in self.config.items():
+        for k, v in config.items():
             print(f" - {k}: {v}")
-        return self.config
+        return config
 
     def get(self, field_name):
         """Safely retrieve a configuration field."""
         if field_name in self.CONFIG_FIELDS:
-            return self.config.get(field_name)
+            return getattr(self, field_name.lower(), None)
         else:
             print(f"⚠️ Error: '{field_name}' is not a valid configuration field.")
             return None
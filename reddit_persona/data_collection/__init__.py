@@ -1,16 +1,142 @@
 import praw
-import datetime
+import time
 import json
 import os
+import re
 from collections import defaultdict
-from urllib.parse import urlparse
+from functools import lru_cache
 from pathlib import Path
 import shutil
+import sqlite3
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+_USER_URL_RE = re.compile(r"^https?://(?:www\.|old\.|new\.|m\.|np\.)?reddit\.com/user/([^/?#]+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=65536)
+def _iso_date(utc_timestamp):
+    """Converts a UTC timestamp to ISO format, memoized for repeated timestamps."""
+    tm = time.gmtime(utc_timestamp)
+    return f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}T{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}"
+
+
+def dumps(obj):
+    """Serializes an object to compact JSON bytes, preferring orjson, then msgspec, when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    if msgspec is not None:
+        return msgspec.json.encode(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    """Deserializes JSON bytes, preferring orjson, then msgspec, when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+class SubredditCache:
+    """Persistent SQLite cache of subreddit information keyed by lowercased subreddit name."""
+
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path, ttl=86400):
+        """
+        Creates the cache table if it does not exist yet.
+        
+        Args:
+            path (str): Path to the SQLite database file.
+            ttl (int): Number of seconds a cached entry stays valid.
+        
+        Raises:
+            sqlite3.Error: If the database cannot be opened or created.
+            OSError: If the database folder cannot be created.
+        """
+        self.path = path
+        self.ttl = ttl
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS subreddits "
+                    "(sub_name TEXT PRIMARY KEY, info BLOB, fetched_at INTEGER)"
+                )
+        finally:
+            conn.close()
+
+    def get_many(self, sub_names):
+        """
+        Looks up unexpired entries for the given subreddits.
+        
+        Args:
+            sub_names (iterable): Lowercased subreddit names.
+        
+        Returns:
+            dict: Subreddit information for every name found in the cache, empty if the cache cannot be read.
+        """
+        sub_names = list(sub_names)
+        cutoff = int(time.time()) - self.ttl
+        cached = {}
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                # Stay below SQLite's limit on bound parameters per statement
+                for start in range(0, len(sub_names), self.LOOKUP_BATCH_SIZE):
+                    batch = sub_names[start:start + self.LOOKUP_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT sub_name, info FROM subreddits WHERE fetched_at >= ? AND sub_name IN ({placeholders})",
+                        (cutoff, *batch)
+                    ).fetchall()
+                    cached.update((sub_name, loads(info)) for sub_name, info in rows)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Subreddit cache lookup failed, fetching everything: {e}")
+            return {}
+        return cached
+
+    def set_many(self, infos):
+        """
+        Stores freshly fetched subreddit information and purges expired entries.
+        
+        Args:
+            infos (dict): Subreddit information keyed by lowercased subreddit name.
+        """
+        now = int(time.time())
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                with conn:
+                    conn.execute("DELETE FROM subreddits WHERE fetched_at < ?", (now - self.ttl,))
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO subreddits (sub_name, info, fetched_at) VALUES (?, ?, ?)",
+                        [(sub_name, dumps(info), now) for sub_name, info in infos.items()]
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Subreddit cache could not be updated: {e}")
+
 
 class DataCollection:
     """A class to collect and save Reddit user data as JSON."""
 
-    def __init__(self, reddit_client_id, reddit_client_secret, reddit_user_agent):
+    def __init__(self, reddit_client_id, reddit_client_secret, reddit_user_agent, subreddit_cache_path="utils/subreddit_cache.db"):
         """
         Initializes the Reddit client and prepares to collect data.
         
@@ -18,6 +144,7 @@ class DataCollection:
             reddit_client_id (str): Reddit client ID.
             reddit_client_secret (str): Reddit client secret.
             reddit_user_agent (str): Reddit user agent.
+            subreddit_cache_path (str, optional): SQLite file caching subreddit info across runs, or None to disable it.
         """
         # Initialize Reddit client
         self.reddit = praw.Reddit(
@@ -25,6 +152,13 @@ class DataCollection:
             client_secret=reddit_client_secret,
             user_agent=reddit_user_agent
         )
+        self.subreddit_cache = None
+        if subreddit_cache_path:
+            try:
+                self.subreddit_cache = SubredditCache(subreddit_cache_path)
+            except (sqlite3.Error, OSError) as e:
+                # The cache is only an optimization, run without it rather than failing
+                print(f"Subreddit cache at {subreddit_cache_path} is unavailable, continuing without it: {e}")
 
     def create_folder(self,folder_name):
         """Deletes the existing folder if it exists, then creates a new one and returns its path."""
@@ -52,10 +186,9 @@ class DataCollection:
         Raises:
             ValueError: If the URL format is invalid.
         """
-        path = urlparse(user_url).path
-        parts = path.strip("/").split("/")
-        if len(parts) >= 2 and parts[0].lower() == "user":
-            return parts[1]
+        match = _USER_URL_RE.match(user_url)
+        if match:
+            return match.group(1)
         raise ValueError("Invalid Reddit user URL")
 
     def iso_date(self, utc_timestamp):
@@ -68,7 +201,7 @@ class DataCollection:
         Returns:
             str: ISO formatted date string.
         """
-        return datetime.datetime.utcfromtimestamp(utc_timestamp).isoformat()
+        return _iso_date(utc_timestamp)
 
     def fetch_user_info(self, redditor):
         """
@@ -115,6 +248,30 @@ class DataCollection:
             "url": f"https://www.reddit.com/r/{subreddit.display_name}"
         }
 
+    def _fetch_sub_safe(self, subreddit):
+        """
+        Fetches subreddit information without raising.
+        
+        Args:
+            subreddit (praw.models.Subreddit): Subreddit object.
+        
+        Returns:
+            dict: Dictionary containing subreddit information, or None if the request fails.
+        """
+        try:
+            return self.fetch_subreddit_info(subreddit)
+        except Exception:
+            return None
+
+    def _placeholder_sub_info(self, sub_name):
+        """Builds the subreddit information used when it could not be fetched."""
+        return {
+            "title": sub_name,
+            "public_description": "",
+            "over_18": None,
+            "url": f"https://www.reddit.com/r/{sub_name}"
+        }
+
     def trim_post_info(self, submission):
         """
         Extracts relevant information from a Reddit post.
@@ -133,26 +290,25 @@ class DataCollection:
             "flair": submission.link_flair_text
         }
 
-    def generate_summary(self, user_info, posts, comments, subreddit_interactions):
+    def generate_summary(self, total_posts, total_comments, subreddit_interactions, created_utc):
         """
         Generates a summary of the user's activity.
         
         Args:
-            user_info (dict): User's basic info.
-            posts (list): List of user posts.
-            comments (list): List of user comments.
+            total_posts (int): Number of user posts.
+            total_comments (int): Number of user comments.
             subreddit_interactions (dict): Dictionary of subreddit interactions.
+            created_utc (float): Account creation time as a UTC epoch timestamp.
         
         Returns:
             dict: Summary information about the user's activity.
         """
-        account_created = datetime.datetime.fromisoformat(user_info["created_at"])
-        account_age_days = (datetime.datetime.utcnow() - account_created).days
-        most_active_sub = max(subreddit_interactions.items(), key=lambda x: x[1], default=(None, 0))[0]
+        account_age_days = int((time.time() - created_utc) // 86400)
+        most_active_sub = max(subreddit_interactions, key=subreddit_interactions.get, default=None)
         
         return {
-            "total_posts": len(posts),
-            "total_comments": sum(len(c["comments"]) for c in comments),
+            "total_posts": total_posts,
+            "total_comments": total_comments,
             "unique_subreddits": len(subreddit_interactions),
             "most_active_subreddit": most_active_sub,
             "account_age_days": account_age_days
@@ -173,10 +329,17 @@ class DataCollection:
         # Define the filename for the output
         filename = os.path.join(self.path, f"{user_info['username']}_reddit_export.json")
 
-        # Write the output to the file
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=4)
-        
+        # Write to a temporary file and move it into place, so a failed write never leaves a truncated export
+        tmp_filename = f"{filename}.tmp"
+        try:
+            with open(tmp_filename, "wb") as f:
+                f.write(dumps(output))
+            os.replace(tmp_filename, filename)
+        except BaseException:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+
         print(f"✅ JSON saved to {filename}")
         return filename
 
@@ -186,55 +349,57 @@ class DataCollection:
         
         Args:
             user_url (str): Reddit user profile URL.
+        
+        Returns:
+            tuple: The exported data as a dict, the JSON file path and the user's folder path.
         """
         print("Initializing User Data Retrival..")
         username = self.extract_username(user_url)
         redditor = self.reddit.redditor(username)
         self.path = self.create_folder(username)
         user_info = self.fetch_user_info(redditor)
-        subreddits_master = {}
         subreddit_interactions_count = defaultdict(int)
         comments_by_post = defaultdict(list)
+        sub_name_by_post = {}
+        subreddit_by_name = {}
+
+        # Bind the lookups used on every iteration to locals once
+        remember_subreddit = subreddit_by_name.setdefault
+        iso_date = self.iso_date
+        trim_post_info = self.trim_post_info
 
         # Collect user comments grouped by submission (original post)
-        
+        total_comments = 0
         for comment in redditor.comments.new(limit=None):
+            total_comments += 1
             submission = comment.submission
-            sub_name = submission.subreddit.display_name.lower()
+            subreddit = submission.subreddit
+            sub_name = subreddit.display_name.lower()
+            remember_subreddit(sub_name, subreddit)
             subreddit_interactions_count[sub_name] += 1
-            comments_by_post[submission.id].append(comment)
-
-            # Cache subreddit info
-            if sub_name not in subreddits_master:
-                try:
-                    sub = self.reddit.subreddit(sub_name)
-                    subreddits_master[sub_name] = self.fetch_subreddit_info(sub)
-                except Exception:
-                    subreddits_master[sub_name] = {
-                        "title": sub_name,
-                        "public_description": "",
-                        "over_18": None,
-                        "url": f"https://www.reddit.com/r/{sub_name}"
-                    }
+            submission_id = submission.id
+            comments_by_post[submission_id].append(comment)
+            sub_name_by_post[submission_id] = sub_name
 
         # Format grouped comments
         print("User comments retrival in process..")
         comments = []
+        append_comment_group = comments.append
         for submission_id, comments_list in comments_by_post.items():
             submission = comments_list[0].submission
-            sub_name = submission.subreddit.display_name.lower()
-            post_info = self.trim_post_info(submission)
+            sub_name = sub_name_by_post[submission_id]
+            post_info = trim_post_info(submission)
 
             user_comments = sorted([
                 {
                     "body": comment.body,
-                    "created_at": self.iso_date(comment.created_utc),
+                    "created_at": iso_date(comment.created_utc),
                     "url": f"https://www.reddit.com{comment.permalink}"
                 }
                 for comment in comments_list
             ], key=lambda x: x["created_at"])
 
-            comments.append({
+            append_comment_group({
                 "post_info": post_info,
                 "subreddit": sub_name,
                 "comments": user_comments
@@ -243,37 +408,44 @@ class DataCollection:
         # Collect user's own posts
         print("User Posts Retrieval in Process..")
         posts = []
+        append_post = posts.append
         for submission in redditor.submissions.new(limit=None):
-            sub_name = submission.subreddit.display_name.lower()
+            subreddit = submission.subreddit
+            sub_name = subreddit.display_name.lower()
+            remember_subreddit(sub_name, subreddit)
             subreddit_interactions_count[sub_name] += 1
 
-            # Cache subreddit info
-            if sub_name not in subreddits_master:
-                try:
-                    sub = self.reddit.subreddit(sub_name)
-                    subreddits_master[sub_name] = self.fetch_subreddit_info(sub)
-                except Exception:
-                    subreddits_master[sub_name] = {
-                        "title": sub_name,
-                        "public_description": "",
-                        "over_18": None,
-                        "url": f"https://www.reddit.com/r/{sub_name}"
-                    }
-
-            post_info = self.trim_post_info(submission)
-            posts.append({
+            post_info = trim_post_info(submission)
+            append_post({
                 "post_info": post_info,
                 "subreddit": sub_name
             })
 
+        # Reuse cached subreddit info and fetch the rest from the Subreddit objects the
+        # submissions already carry. praw.Reddit is not thread safe, so this stays serial
+        unique_subs = list(subreddit_interactions_count)
+        cached = self.subreddit_cache.get_many(unique_subs) if self.subreddit_cache else {}
+        fetched = {}
+        for sub_name in unique_subs:
+            if sub_name not in cached:
+                info = self._fetch_sub_safe(subreddit_by_name[sub_name])
+                if info is not None:
+                    fetched[sub_name] = info
+        if self.subreddit_cache and fetched:
+            self.subreddit_cache.set_many(fetched)
+        subreddits_master = {
+            sub_name: cached.get(sub_name) or fetched.get(sub_name) or self._placeholder_sub_info(sub_name)
+            for sub_name in unique_subs
+        }
+
         # Add interaction counts to each subreddit
         for sub_name, count in subreddit_interactions_count.items():
             subreddits_master[sub_name]["interactions_count"] = count
 
-        summary = self.generate_summary(user_info, posts, comments, subreddit_interactions_count)
+        summary = self.generate_summary(len(posts), total_comments, subreddit_interactions_count, redditor.created_utc)
 
         output = {
-            "exported_at": datetime.datetime.utcnow().isoformat(),
+            "exported_at": self.iso_date(int(time.time())),
             "user_info": user_info,
             "summary": summary,
             "subreddits_master": subreddits_master,
@@ -281,10 +453,6 @@ class DataCollection:
             "posts": posts
         }
 
-        # Save the output to JSON file
+        # Save the output to JSON file, the dict itself is handed on to the analysis stage
         filename = self.save_json(output, user_info)
-        return filename,self.path
-    
-
-
-
+        return output,filename,self.path
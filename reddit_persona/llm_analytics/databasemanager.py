@@ -1,38 +1,121 @@
 import chromadb
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 import os
 
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+except ImportError:
+    ORTModelForFeatureExtraction = None
+
+
+class QuantizedEmbeddingModel:
+    """INT8 ONNX Runtime version of a sentence-transformers model exposing an SBERT-like encode()."""
+
+    QUANTIZED_FILE = "model_quantized.onnx"
+
+    def __init__(self, model_name, save_dir, max_seq_length=256):
+        # SentenceTransformer truncates all-MiniLM-L6-v2 inputs at 256 tokens (its sentence_bert_config.json),
+        # not at the tokenizer's 512, so long texts must be cut at the same length to embed the same way
+        self.max_seq_length = max_seq_length
+        model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        model_dir = os.path.join(save_dir, model_id.replace("/", "__"))
+        # Export and dynamically quantize once, later runs load the saved INT8 model
+        if not os.path.exists(os.path.join(model_dir, self.QUANTIZED_FILE)):
+            model = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True, provider="CPUExecutionProvider")
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantizer.quantize(
+                save_dir=model_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            )
+            AutoTokenizer.from_pretrained(model_id).save_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name=self.QUANTIZED_FILE, provider="CPUExecutionProvider"
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=False):
+        # Mean-pools token embeddings and L2-normalizes them like the all-MiniLM-L6-v2 pipeline,
+        # so the remaining SBERT keyword arguments are accepted only for API compatibility
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        embeddings = np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
 class DatabaseManager:
-    def __init__(self, path, collection_name="reddit_user_data", embedding_model_name="all-MiniLM-L6-v2"):
+    ADD_BATCH_SIZE = 5000
+    # Bodies left behind by deleted or removed content carry nothing worth embedding
+    REMOVED_BODIES = {"", "[removed]", "[deleted]"}
+    MIN_COMMENT_LENGTH = 16
+
+    def __init__(self, path, collection_name="reddit_user_data", embedding_model_name="all-MiniLM-L6-v2",
+                 quantize=False, quantized_model_dir="utils/onnx_models"):
         # Initialize ChromaDB client and collection
         chroma_path = os.path.join(path,"./chroma_db")
         self.chroma_client = chromadb.PersistentClient(path=chroma_path)
         self.collection = self.chroma_client.get_or_create_collection(name=collection_name)
-        # Load embedding model
-        self.embedding_model = SentenceTransformer(embedding_model_name)
+        # Load embedding model, using the INT8 ONNX Runtime version when requested and optimum is installed
+        if quantize and ORTModelForFeatureExtraction is not None:
+            self.embedding_model = QuantizedEmbeddingModel(embedding_model_name, quantized_model_dir)
+        else:
+            if quantize:
+                print("⚠️ optimum[onnxruntime] is not installed (pip install reddit_persona[onnx]), falling back to the PyTorch embedding model.")
+            # Run on the GPU in FP16 when one is available
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.embedding_model = SentenceTransformer(embedding_model_name, device=device)
+            if device == "cuda":
+                self.embedding_model.half()
 
     def clean_metadata(self, metadata: dict) -> dict:
         return {k: ("" if v is None else v) for k, v in metadata.items()}
 
     def embed_text(self, text: str):
-        # Returns embedding as list
-        return self.embedding_model.encode(text).tolist()
+        # Returns embedding as list, it is handed out as the collection's embedding function
+        return self.embedding_model.encode(text, convert_to_numpy=True).tolist()
+
+    def embed_texts(self, texts, batch_size=64):
+        # Encodes all texts in batches and returns one contiguous float32 (N, dim) array.
+        # Texts are encoded shortest first so each batch pads to a similar length,
+        # then the embeddings are scattered back to the input order.
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        encoded = self.embedding_model.encode(
+            [texts[i] for i in order],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            normalize_embeddings=False
+        )
+        embeddings = np.empty(encoded.shape, dtype=np.float32)
+        embeddings[order] = encoded
+        return embeddings
 
     def upload_reddit_user_data(self, json_data):
         ids = []
         documents = []
-        embeddings = []
         metadatas = []
 
         # Subreddits
         for subreddit_name, subreddit_data in json_data.get("subreddits_master", {}).items():
             doc_id = f"sub_{subreddit_name}"
             text = f"{subreddit_data.get('title', '')} {subreddit_data.get('public_description', '')}"
-            vector = self.embed_text(text)
+            if not text.strip():
+                continue
 
             ids.append(doc_id)
             documents.append(text)
-            embeddings.append(vector)
             metadatas.append(self.clean_metadata({
                 "type": "subreddit",
                 "subreddit_name": subreddit_name,
@@ -44,8 +127,11 @@ class DatabaseManager:
             post_info = post["post_info"]
             subreddit_name = post["subreddit"]
             flair_text = post_info.get("flair", "")
-            text = f"title: {post_info['title']} flair: {flair_text} subreddit:{subreddit_name} content: {post_info['body']}"
-            vector = self.embed_text(text)
+            # Posts keep their title even when the body is gone
+            body = post_info['body']
+            if body.strip() in self.REMOVED_BODIES:
+                body = ""
+            text = f"title: {post_info['title']} flair: {flair_text} subreddit:{subreddit_name} content: {body}"
 
             post_payload = {
                 "type": "post",
@@ -53,13 +139,11 @@ class DatabaseManager:
                 "post_flair": flair_text,
                 "post_url": post_info["reddit_url"],
                 "post_created_at": post_info["created_at"],
-                "subreddit_name": subreddit_name,
-                "body": post_info["body"]
+                "subreddit_name": subreddit_name
             }
 
             ids.append(f"post_{idx}")
             documents.append(text)
-            embeddings.append(vector)
             metadatas.append(self.clean_metadata(post_payload))
 
         # Comments
@@ -69,12 +153,14 @@ class DatabaseManager:
             subreddit_name = comment_group["subreddit"]
 
             for comment in comment_group["comments"]:
+                # Skip removed and near-empty comments
+                body = comment['body'].strip()
+                if body in self.REMOVED_BODIES or len(body) < self.MIN_COMMENT_LENGTH:
+                    continue
                 text = f"content: {comment['body']} post_title: {post_info['title']} subreddit: {subreddit_name}"
-                vector = self.embed_text(text)
 
                 comment_payload = {
                     "type": "comment",
-                    "comment_body": comment["body"],
                     "comment_created_at": comment["created_at"],
                     "comment_url": comment["url"],
                     "post_title": post_info["title"],
@@ -84,40 +170,47 @@ class DatabaseManager:
 
                 ids.append(f"comment_{comment_counter}")
                 documents.append(text)
-                embeddings.append(vector)
                 metadatas.append(self.clean_metadata(comment_payload))
                 comment_counter += 1
 
-        # Upload all to ChromaDB
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
+        # Embed every document in one batched pass
+        embeddings = self.embed_texts(documents)
+
+        # Upload all to ChromaDB in bulk, chunked to stay under its per-call batch limit
+        for start in range(0, len(ids), self.ADD_BATCH_SIZE):
+            end = start + self.ADD_BATCH_SIZE
+            self.collection.add(
+                ids=ids[start:end],
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end]
+            )
         
         print(f"✅ Uploaded {len(ids)} records to ChromaDB.")
         return self.collection,self.embed_text
 
-    def retrieve(self, query: str, n_results=5):
+    def retrieve(self, query, n_results=5):
         """
         Retrieve the top `n_results` most similar records for the given query.
         Returns list of dictionaries with document and metadata.
+        A list of queries is embedded and searched in one batch, returning one such list per query.
         """
-        query_embedding = self.embed_text(query)
+        single = isinstance(query, str)
+        queries = [query] if single else list(query)
+        query_embeddings = self.embed_texts(queries)
         results = self.collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=query_embeddings,
             n_results=n_results,
             include=["documents", "metadatas", "distances"]
         )
 
-        # results is a dict with keys like 'ids', 'documents', 'metadatas', 'distances'
-        retrieved = []
-        for i in range(len(results['documents'][0])):
-            retrieved.append({
-                "document": results['documents'][0][i],
-                "metadata": results['metadatas'][0][i],
-                "distance": results['distances'][0][i]
-            })
+        # results is a dict with keys like 'ids', 'documents', 'metadatas', 'distances', each holding one list per query
+        retrieved = [
+            [
+                {"document": document, "metadata": metadata, "distance": distance}
+                for document, metadata, distance in zip(docs, metas, dists)
+            ]
+            for docs, metas, dists in zip(results['documents'], results['metadatas'], results['distances'])
+        ]
 
-        return retrieved
+        return retrieved[0] if single else retrieved
@@ -1,36 +1,149 @@
 import re
-from collections import Counter
 import torch
 import torch.nn.functional as F
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from transformers import BertTokenizer, BertForSequenceClassification
 from transformers import pipeline
 from collections import defaultdict
+import os
+import numpy as np
+
+try:
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+except ImportError:
+    ORTModelForSequenceClassification = None
+
+_torch_threads_configured = False
+
+def _configure_torch_threads():
+    # Use all but one core for intra-op math, once per process
+    global _torch_threads_configured
+    if _torch_threads_configured:
+        return
+    _torch_threads_configured = True
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) - 1))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before any inter-op parallel work has started
+        pass
+
+def _window_starts(n_tokens, window, stride, max_windows=None):
+    # Start offsets of windows of `window` tokens overlapping by `stride`. The last window is
+    # end-aligned so every window is full length, and past `max_windows` the windows are spread
+    # evenly over the text instead of covering all of it
+    last = max(n_tokens - window, 0)
+    starts = list(range(0, last, window - stride)) + [last]
+    if max_windows is not None and len(starts) > max_windows:
+        if max_windows == 1:
+            return [0]
+        starts = [round(i * last / (max_windows - 1)) for i in range(max_windows)]
+    return starts
+
+def _keyword_index(traits):
+    # Gives every keyword an integer id and builds a (keywords x traits) 0/1 matrix,
+    # a few keywords belong to two traits
+    keyword_ids = {}
+    for keywords in traits.values():
+        for keyword in keywords:
+            keyword_ids.setdefault(keyword, len(keyword_ids))
+    trait_matrix = np.zeros((len(keyword_ids), len(traits)), dtype=np.int64)
+    for column, keywords in enumerate(traits.values()):
+        for keyword in keywords:
+            trait_matrix[keyword_ids[keyword], column] = 1
+    return keyword_ids, trait_matrix
+
+def _keyword_pattern(keywords):
+    # Single alternation over all keywords, longest first so phrases win over their prefixes.
+    # The words of a phrase may be separated by any whitespace, including line breaks
+    alternation = "|".join(
+        r"\s+".join(re.escape(word) for word in keyword.split())
+        for keyword in sorted(keywords, key=len, reverse=True)
+    )
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)")
+
+_MBTI_TRAITS = {
+    'E': ['social', 'outgoing', 'talkative', 'lively', 'active', 'party', 'friends', 'chatty', 'extrovert', 'hangout', 'crowd', 'fun', 'vibe', 'bubbly'],
+    'I': ['quiet', 'alone', 'introverted', 'reserved', 'solitary', 'reflective', 'introspective', 'shy', 'lowkey', 'chill', 'private', 'solo', 'withdrawn', 'thoughtful'],
+    'S': ['facts', 'details', 'practical', 'realistic', 'hands-on', 'experience', 'real', 'concrete', 'grounded', 'traditional', 'literal', 'specific', 'common sense'],
+    'N': ['ideas', 'concepts', 'future', 'abstract', 'intuitive', 'theoretical', 'big-picture', 'vision', 'imagine', 'possibilities', 'dream', 'creative', 'innovative', 'open-minded'],
+    'T': ['logic', 'reasoning', 'objective', 'analytical', 'rational', 'decisions', 'facts', 'debate', 'critical', 'truth', 'evidence', 'skeptic', 'cold', 'direct', 'fair'],
+    'F': ['feelings', 'compassion', 'emotions', 'subjective', 'personal', 'harmony', 'values', 'caring', 'empathy', 'warm', 'support', 'understand', 'sensitive', 'kind'],
+    'J': ['organized', 'structured', 'planning', 'decisive', 'predictable', 'control', 'scheduled', 'rule', 'neat', 'on time', 'planner', 'prepared', 'early', 'responsible'],
+    'P': ['flexible', 'adaptable', 'spontaneous', 'open', 'improvised', 'curious', 'chill', 'go with the flow', 'last minute', 'laid back', 'unplanned', 'easygoing', 'open-ended']
+}
+
+# Built once per process and shared by every NonLLMAnalysis instance
+_MBTI_KEYWORD_IDS, _MBTI_TRAIT_MATRIX = _keyword_index(_MBTI_TRAITS)
+_MBTI_PATTERN = _keyword_pattern(_MBTI_KEYWORD_IDS)
+
+# Inference runs on the GPU in FP16 when one is available
+_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+# Distilled 6-layer model with the same six emotion labels as bert-base-uncased-emotion
+EMOTION_MODEL = "bhadresh-savani/distilbert-base-uncased-emotion"
+# Labels of EMOTION_MODEL, replaced by the loaded model's own id2label once it is loaded
+EMOTION_LABELS = ['sadness', 'joy', 'love', 'anger', 'fear', 'surprise']
 
 class NonLLMAnalysis:
 
-    def __init__(self, reddit_data):
+    def __init__(self, reddit_data, use_onnx=False, onnx_model_dir="utils/onnx_models"):
         self.reddit_data = reddit_data
+        self.use_onnx = use_onnx
+        self.onnx_model_dir = onnx_model_dir
+        # Models are loaded on first use and kept for the lifetime of the instance
+        self._personality_tokenizer = None
+        self._personality_model = None
+        self.emotion_classifier = None
+        self.emotion_labels = EMOTION_LABELS
+        self._walk = None
+        _configure_torch_threads()
+
+    def _ensure_personality(self):
+        if self._personality_model is None:
+            self._personality_tokenizer = BertTokenizer.from_pretrained("Minej/bert-base-personality")
+            self._personality_model = BertForSequenceClassification.from_pretrained("Minej/bert-base-personality")
+            self._personality_model.to(_DEVICE)
+            if _DEVICE == "cuda":
+                self._personality_model.half()
+            self._personality_model.eval()
+        return self._personality_tokenizer, self._personality_model
+
+    def _load_onnx_emotion_model(self):
+        # Export to ONNX once and reuse the saved model on later runs
+        model_dir = os.path.join(self.onnx_model_dir, EMOTION_MODEL.replace("/", "__"))
+        if not os.path.exists(os.path.join(model_dir, "model.onnx")):
+            model = ORTModelForSequenceClassification.from_pretrained(EMOTION_MODEL, export=True)
+            model.save_pretrained(model_dir)
+            AutoTokenizer.from_pretrained(EMOTION_MODEL).save_pretrained(model_dir)
+        return ORTModelForSequenceClassification.from_pretrained(model_dir), AutoTokenizer.from_pretrained(model_dir)
+
+    def _ensure_emotion(self):
+        if self.emotion_classifier is None:
+            if self.use_onnx and ORTModelForSequenceClassification is not None:
+                model, tokenizer = self._load_onnx_emotion_model()
+                self.emotion_classifier = pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None)
+            else:
+                if self.use_onnx:
+                    print("optimum[onnxruntime] is not installed (pip install reddit_persona[onnx]), falling back to the PyTorch emotion model.")
+                self.emotion_classifier = pipeline(
+                    "text-classification",
+                    model=EMOTION_MODEL,
+                    top_k=None,
+                    device=_DEVICE,
+                    torch_dtype=torch.float16 if _DEVICE == "cuda" else None
+                )
+            # Count top emotions by the labels this model actually emits
+            id2label = self.emotion_classifier.model.config.id2label
+            self.emotion_labels = [id2label[i] for i in sorted(id2label)]
+        return self.emotion_classifier
 
     def analyze_mbtitext(self, text, karma_points=0, comment_points=0):
-        traits = {
-            'E': ['social', 'outgoing', 'talkative', 'lively', 'active', 'party', 'friends', 'chatty', 'extrovert', 'hangout', 'crowd', 'fun', 'vibe', 'bubbly'],
-            'I': ['quiet', 'alone', 'introverted', 'reserved', 'solitary', 'reflective', 'introspective', 'shy', 'lowkey', 'chill', 'private', 'solo', 'withdrawn', 'thoughtful'],
-            'S': ['facts', 'details', 'practical', 'realistic', 'hands-on', 'experience', 'real', 'concrete', 'grounded', 'traditional', 'literal', 'specific', 'common sense'],
-            'N': ['ideas', 'concepts', 'future', 'abstract', 'intuitive', 'theoretical', 'big-picture', 'vision', 'imagine', 'possibilities', 'dream', 'creative', 'innovative', 'open-minded'],
-            'T': ['logic', 'reasoning', 'objective', 'analytical', 'rational', 'decisions', 'facts', 'debate', 'critical', 'truth', 'evidence', 'skeptic', 'cold', 'direct', 'fair'],
-            'F': ['feelings', 'compassion', 'emotions', 'subjective', 'personal', 'harmony', 'values', 'caring', 'empathy', 'warm', 'support', 'understand', 'sensitive', 'kind'],
-            'J': ['organized', 'structured', 'planning', 'decisive', 'predictable', 'control', 'scheduled', 'rule', 'neat', 'on time', 'planner', 'prepared', 'early', 'responsible'],
-            'P': ['flexible', 'adaptable', 'spontaneous', 'open', 'improvised', 'curious', 'chill', 'go with the flow', 'last minute', 'laid back', 'unplanned', 'easygoing', 'open-ended']
-        }
-
-        words = re.findall(r'\w+', text.lower())
-        word_counts = Counter(words)
-
-        scores = {trait: 0 for trait in traits}
-        for trait, keywords in traits.items():
-            for keyword in keywords:
-                scores[trait] += word_counts.get(keyword, 0)
+        # One scan over the text also matches multi-word and hyphenated keywords
+        # and the per-trait tally is a bincount over keyword ids times the keyword/trait matrix
+        ids = [_MBTI_KEYWORD_IDS[" ".join(keyword.split())] for keyword in _MBTI_PATTERN.findall(text.lower())]
+        counts = np.bincount(ids, minlength=len(_MBTI_KEYWORD_IDS)) @ _MBTI_TRAIT_MATRIX
+        scores = dict(zip(_MBTI_TRAITS, counts.tolist()))
 
         karma_factor = karma_points / 1000
         comment_factor = comment_points / 1000
@@ -74,16 +187,30 @@ class NonLLMAnalysis:
             }
         }, summary_string
 
+    def _walk_once(self):
+        # Single traversal of posts and comments shared by the MBTI, Big Five and emotion passes.
+        # Returns the joined body text and (owner, subreddit, text) tuples, where owner is the
+        # post or comment dict that receives its emotions.
+        if self._walk is None:
+            parts = []
+            pairs = []
+            for post in self.reddit_data['posts']:
+                post_info = post['post_info']
+                parts.append(post_info['body'])
+                pairs.append((post, post['subreddit'], post_info.get('body') or post_info.get('title') or ""))
+            for comment_group in self.reddit_data['comments']:
+                subreddit = comment_group['subreddit']
+                for comment in comment_group['comments']:
+                    parts.append(comment['body'])
+                    pairs.append((comment, subreddit, comment.get('body') or ""))
+            self._walk = (" ".join(parts).strip(), pairs)
+        return self._walk
+
     def extract_post_comment_text(self):
-        text = ""
-        for post in self.reddit_data['posts']:
-            text += post['post_info']['body'] + " "
-        for comment_group in self.reddit_data['comments']:
-            for comment in comment_group['comments']:
-                text += comment['body'] + " "
+        text, _ = self._walk_once()
         karma_points = self.reddit_data['user_info']['link_karma']
         comment_points = self.reddit_data['user_info']['comment_karma']
-        return text.strip(), karma_points, comment_points
+        return text, karma_points, comment_points
 
     # def big_five(self, text):
     #     model_name = "yohannes/writer-personality-prediction"
@@ -104,13 +231,25 @@ class NonLLMAnalysis:
     
     
 
-    def personality_detection(self,text):
-        tokenizer = BertTokenizer.from_pretrained("Minej/bert-base-personality")
-        model = BertForSequenceClassification.from_pretrained("Minej/bert-base-personality")
+    def personality_detection(self, text, max_length=512, stride=64, batch_size=16, max_windows=32):
+        tokenizer, model = self._ensure_personality()
 
-        inputs = tokenizer(text, truncation=True, padding=True, return_tensors="pt")
-        outputs = model(**inputs)
-        predictions = outputs.logits.squeeze().detach().numpy()
+        # Split the text into overlapping windows instead of silently keeping only the first 512 tokens,
+        # at most max_windows of them so the cost stays bounded for long histories
+        ids = tokenizer(text, add_special_tokens=False, truncation=False)['input_ids']
+        window = max_length - tokenizer.num_special_tokens_to_add()
+        chunks = [
+            tokenizer.build_inputs_with_special_tokens(ids[start:start + window])
+            for start in _window_starts(len(ids), window, stride, max_windows)
+        ]
+
+        # Score the windows in batches and average their logits
+        logits = []
+        with torch.inference_mode():
+            for start in range(0, len(chunks), batch_size):
+                inputs = tokenizer.pad({'input_ids': chunks[start:start + batch_size]}, return_tensors="pt").to(_DEVICE)
+                logits.append(model(**inputs).logits.float())
+        predictions = torch.cat(logits).mean(dim=0).cpu().numpy()
 
         label_names = ['Extroversion', 'Neuroticism', 'Agreeableness', 'Conscientiousness', 'Openness']
         result = {label_names[i]: predictions[i] for i in range(len(label_names))}
@@ -123,58 +262,55 @@ class NonLLMAnalysis:
     
     def get_emotions(self, text):
         try:
-            results = self.emotion_classifier(text)[0]
+            results = self.emotion_classifier(text, truncation=True)[0]
             return {item['label']: item['score'] for item in results}
         except Exception as e:
             print(f"Error processing emotions for text: {text[:30]}... \nError: {e}")
             return {}
 
-    def emotion_detections(self):
-        reddit_data_2 = self.reddit_data.copy()
+    def get_emotions_batch(self, texts, batch_size=32):
+        # Classify shortest texts first so each batch pads to a similar length
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        try:
+            results = self.emotion_classifier([texts[i] for i in order], batch_size=batch_size, truncation=True)
+        except Exception as e:
+            print(f"Error processing emotions in batch, retrying text by text... \nError: {e}")
+            return [self.get_emotions(text) for text in texts]
 
-        self.emotion_classifier = pipeline(
-            "text-classification",
-            model="nateraw/bert-base-uncased-emotion",
-            top_k=None
-        )
+        emotions = [None] * len(texts)
+        for i, result in zip(order, results):
+            emotions[i] = {item['label']: item['score'] for item in result}
+        return emotions
+
+    def emotion_detections(self):
+        # Posts and comments are annotated with their emotions in place
+        self._ensure_emotion()
 
         emotion_sums = defaultdict(lambda: defaultdict(float))
         emotion_counts = defaultdict(int)
-        top_emotion_counter = defaultdict(list)
+        # Per subreddit, how often each emotion label was the top one, indexed like self.emotion_labels
+        label_index = {label: i for i, label in enumerate(self.emotion_labels)}
+        top_emotion_counts = defaultdict(lambda: np.zeros(len(label_index), dtype=np.int32))
+
+        _, pairs = self._walk_once()
 
-        # Process posts
-        for post in reddit_data_2['posts']:
-            text = post['post_info'].get('body') or post['post_info'].get('title') or ""
-            emotions = self.get_emotions(text)
-            post['emotions'] = emotions
+        # Classify everything in batches and scatter the results back
+        all_emotions = self.get_emotions_batch([text for _, _, text in pairs])
+        for (owner, subreddit, _), emotions in zip(pairs, all_emotions):
+            owner['emotions'] = emotions
 
-            subreddit = post['subreddit']
             for emotion, score in emotions.items():
                 emotion_sums[subreddit][emotion] += score
             emotion_counts[subreddit] += 1
 
             if emotions:
                 top_emotion = max(emotions.items(), key=lambda x: x[1])[0]
-                top_emotion_counter[subreddit].append(top_emotion)
-
-        # Process comments
-        for comment_group in reddit_data_2['comments']:
-            subreddit = comment_group['subreddit']
-            for comment in comment_group['comments']:
-                text = comment.get('body') or ""
-                emotions = self.get_emotions(text)
-                comment['emotions'] = emotions
-
-                for emotion, score in emotions.items():
-                    emotion_sums[subreddit][emotion] += score
-                emotion_counts[subreddit] += 1
-
-                if emotions:
-                    top_emotion = max(emotions.items(), key=lambda x: x[1])[0]
-                    top_emotion_counter[subreddit].append(top_emotion)
+                # Labels the model did not declare are left out of the tally instead of aborting the pass
+                if top_emotion in label_index:
+                    top_emotion_counts[subreddit][label_index[top_emotion]] += 1
 
         subreddit_emotion_summary = {}
-        subreddit_master = reddit_data_2.get('subreddits_master', {})
+        subreddit_master = self.reddit_data.get('subreddits_master', {})
 
         for subreddit, totals in emotion_sums.items():
             count = emotion_counts[subreddit]
@@ -182,7 +318,8 @@ class NonLLMAnalysis:
                 emotion: round(total / count, 4)
                 for emotion, total in totals.items()
             }
-            most_common = Counter(top_emotion_counter[subreddit]).most_common(1)[0][0]
+            top_counts = top_emotion_counts[subreddit]
+            most_common = self.emotion_labels[top_counts.argmax()] if top_counts.any() else None
             interactions_count = subreddit_master.get(subreddit, {}).get('interactions_count', 0)
 
             subreddit_emotion_summary[subreddit] = {
@@ -197,39 +334,40 @@ class NonLLMAnalysis:
             reverse=True
         )
 
-        output = "Top Subreddits by Interactions:\n"
+        out_lines = ["Top Subreddits by Interactions:"]
         for i, (subreddit, data) in enumerate(top_subreddits, start=1):
-            output += f"{i}. r/{subreddit}\n"
-            output += f"   Interactions: {data['interactions_count']}\n"
-            output += f"   Most Common Top Emotion: {data['most_common_top_emotion']}\n"
-            output += "   Average Emotions:\n"
+            out_lines.append(f"{i}. r/{subreddit}")
+            out_lines.append(f"   Interactions: {data['interactions_count']}")
+            out_lines.append(f"   Most Common Top Emotion: {data['most_common_top_emotion']}")
+            out_lines.append("   Average Emotions:")
             for emotion, score in data['average_emotions'].items():
-                output += f"     {emotion}: {score:.4f}\n"
-            output += "\n" 
+                out_lines.append(f"     {emotion}: {score:.4f}")
+            out_lines.append("")
+        output = "\n".join(out_lines) + "\n"
 
-        return reddit_data_2, subreddit_emotion_summary, output
+        return self.reddit_data, subreddit_emotion_summary, output
 
     
     def print_analysis_summaries(self,mbti_summary_str, bigfive_summary_str, subreddit_emotion_summary_str):
         separator = "\n" + "✨" * 30 + "\n"
         
-        full_report = (
-            separator +
-            "🧠 MBTI Personality Analysis\n" +
-            separator +
-            mbti_summary_str + "\n" +
-            separator +
-            "🌟 Big Five Personality Analysis\n" +
-            separator +
-            bigfive_summary_str + "\n" +
-            separator +
-            "📊 Subreddit Emotion Summary\n" +
-            separator +
-            subreddit_emotion_summary_str + "\n" +
-            separator +
-            "🎉 Thanks for exploring your personality and emotions with us! Stay curious and keep shining! ✨\n"
-            + "💬 Feel free to reach out for more insights anytime! 🚀"
-        )
+        full_report = "".join([
+            separator,
+            "🧠 MBTI Personality Analysis\n",
+            separator,
+            mbti_summary_str, "\n",
+            separator,
+            "🌟 Big Five Personality Analysis\n",
+            separator,
+            bigfive_summary_str, "\n",
+            separator,
+            "📊 Subreddit Emotion Summary\n",
+            separator,
+            subreddit_emotion_summary_str, "\n",
+            separator,
+            "🎉 Thanks for exploring your personality and emotions with us! Stay curious and keep shining! ✨\n",
+            "💬 Feel free to reach out for more insights anytime! 🚀"
+        ])
         
         print(full_report)
 
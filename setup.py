@@ -0,0 +1,24 @@
+from setuptools import setup, Extension
+
+# Opt-in: the data collection module is compiled ahead of time only when Cython is already
+# installed in the build environment, e.g. `pip install Cython` followed by
+# `pip install --no-build-isolation .`. Regular builds stay pure Python.
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+ext_modules = []
+if cythonize is not None:
+    ext_modules = cythonize(
+        [
+            Extension(
+                "reddit_persona.data_collection.__init__",
+                ["reddit_persona/data_collection/__init__.py"],
+                optional=True,
+            )
+        ],
+        compiler_directives={"language_level": 3, "boundscheck": False},
+    )
+
+setup(ext_modules=ext_modules)
@@ -0,0 +1,74 @@
+import yaml
+
+from reddit_persona.config import _load_yaml_fields, RedditConfig
+
+FIELDS = RedditConfig.CONFIG_FIELDS
+
+
+def write_yaml(tmp_path, lines):
+    path = tmp_path / "config.yaml"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def filler(count):
+    return [f"EXTRA_{i}: value {i}" for i in range(count)]
+
+
+def test_header_with_every_field_matches_full_parse(tmp_path):
+    path = write_yaml(tmp_path, [
+        "REDDIT_CLIENT_ID: id",
+        "REDDIT_CLIENT_SECRET: secret",
+        "REDDIT_USER_AGENT: agent",
+    ] + filler(100))
+
+    config_data = _load_yaml_fields(path, FIELDS)
+
+    assert config_data["REDDIT_USER_AGENT"] == "agent"
+    with open(path) as f:
+        full_data = yaml.safe_load(f)
+    assert {field: config_data[field] for field in FIELDS} == {field: full_data[field] for field in FIELDS}
+
+
+def test_block_scalar_crossing_the_header_is_read_in_full(tmp_path):
+    agent_lines = [f"  agent line {i}" for i in range(10)]
+    path = write_yaml(tmp_path, [
+        "REDDIT_CLIENT_ID: id",
+        "REDDIT_CLIENT_SECRET: secret",
+    ] + filler(27) + [
+        "REDDIT_USER_AGENT: |",
+    ] + agent_lines + filler(5))
+
+    config_data = _load_yaml_fields(path, FIELDS)
+
+    assert config_data["REDDIT_USER_AGENT"] == "\n".join(line.strip() for line in agent_lines) + "\n"
+
+
+def test_field_redefined_after_the_header_wins(tmp_path):
+    path = write_yaml(tmp_path, [
+        "REDDIT_CLIENT_ID: id",
+        "REDDIT_CLIENT_SECRET: secret",
+        "REDDIT_USER_AGENT: old agent",
+    ] + filler(50) + [
+        "REDDIT_USER_AGENT: new agent",
+    ])
+
+    assert _load_yaml_fields(path, FIELDS)["REDDIT_USER_AGENT"] == "new agent"
+
+
+def test_missing_field_in_header_falls_back_to_full_parse(tmp_path):
+    path = write_yaml(tmp_path, [
+        "REDDIT_CLIENT_ID: id",
+        "REDDIT_CLIENT_SECRET: secret",
+    ] + filler(50) + [
+        "REDDIT_USER_AGENT: agent",
+    ])
+
+    assert _load_yaml_fields(path, FIELDS)["REDDIT_USER_AGENT"] == "agent"
+
+
+def test_short_and_empty_files(tmp_path):
+    assert _load_yaml_fields(write_yaml(tmp_path, ["REDDIT_CLIENT_ID: id"]), FIELDS) == {"REDDIT_CLIENT_ID": "id"}
+    empty = tmp_path / "empty.yaml"
+    empty.write_text("")
+    assert _load_yaml_fields(str(empty), FIELDS) == {}
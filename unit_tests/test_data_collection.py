@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from reddit_persona.data_collection import DataCollection, SubredditCache
+
+
+@pytest.fixture
+def datacollection(tmp_path):
+    collector = DataCollection(
+        reddit_client_id="id",
+        reddit_client_secret="secret",
+        reddit_user_agent="reddit_persona tests",
+        subreddit_cache_path=None
+    )
+    collector.path = tmp_path
+    return collector
+
+
+def test_save_json_writes_valid_json(datacollection, tmp_path):
+    output = {
+        "user_info": {"username": "bob"},
+        "comments": [{"body": "héllo\n\"quoted\"", "created_at": "2024-01-01T00:00:00"}],
+        "posts": []
+    }
+
+    filename = datacollection.save_json(output, output["user_info"])
+
+    with open(filename, "rb") as f:
+        assert json.load(f) == output
+    assert [p.name for p in tmp_path.iterdir()] == ["bob_reddit_export.json"]
+
+
+def test_save_json_failure_leaves_no_partial_export(datacollection, tmp_path):
+    output = {"user_info": {"username": "bob"}, "posts": [object()]}
+
+    with pytest.raises(TypeError):
+        datacollection.save_json(output, output["user_info"])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_save_json_failure_keeps_previous_export(datacollection, tmp_path):
+    previous = {"user_info": {"username": "bob"}, "posts": []}
+    datacollection.save_json(previous, previous["user_info"])
+
+    with pytest.raises(TypeError):
+        datacollection.save_json({"posts": [object()]}, previous["user_info"])
+
+    with open(tmp_path / "bob_reddit_export.json", "rb") as f:
+        assert json.load(f) == previous
+
+
+def test_subreddit_cache_returns_only_requested_entries(tmp_path):
+    cache = SubredditCache(str(tmp_path / "cache.db"))
+    cache.set_many({"python": {"title": "Python"}, "rust": {"title": "Rust"}})
+
+    assert cache.get_many(["python", "golang"]) == {"python": {"title": "Python"}}
+    assert cache.get_many([]) == {}
+
+
+def test_subreddit_cache_expires_and_purges_entries(tmp_path, monkeypatch):
+    cache = SubredditCache(str(tmp_path / "cache.db"), ttl=60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.set_many({"python": {"title": "Python"}})
+
+    monkeypatch.setattr(time, "time", lambda: now + 59)
+    assert cache.get_many(["python"]) == {"python": {"title": "Python"}}
+
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get_many(["python"]) == {}
+
+    # Writing purges rows older than the TTL
+    cache.set_many({"rust": {"title": "Rust"}})
+    conn = sqlite3.connect(cache.path)
+    try:
+        rows = conn.execute("SELECT sub_name FROM subreddits").fetchall()
+    finally:
+        conn.close()
+    assert rows == [("rust",)]
+
+
+def test_unusable_subreddit_cache_is_disabled(tmp_path):
+    # A directory cannot be opened as an SQLite database
+    collector = DataCollection(
+        reddit_client_id="id",
+        reddit_client_secret="secret",
+        reddit_user_agent="reddit_persona tests",
+        subreddit_cache_path=str(tmp_path)
+    )
+
+    assert collector.subreddit_cache is None
+
+
+@pytest.mark.parametrize("user_url", [
+    "https://www.reddit.com/user/Foo/",
+    "https://reddit.com/user/Foo",
+    "http://old.reddit.com/user/Foo/comments/",
+    "https://new.reddit.com/user/Foo?sort=top",
+    "https://m.reddit.com/user/Foo",
+    "https://np.reddit.com/user/Foo#posts",
+    "HTTPS://WWW.REDDIT.COM/user/Foo",
+])
+def test_extract_username_accepts_reddit_profile_urls(datacollection, user_url):
+    assert datacollection.extract_username(user_url) == "Foo"
+
+
+@pytest.mark.parametrize("user_url", [
+    "https://www.reddit.com/r/python/",
+    "https://www.reddit.com/user/",
+    "https://example.com/user/Foo",
+    "https://notreddit.com/user/Foo",
+    "https://www.reddit.com.example.com/user/Foo",
+    "reddit.com/user/Foo",
+    "ftp://www.reddit.com/user/Foo",
+])
+def test_extract_username_rejects_other_urls(datacollection, user_url):
+    with pytest.raises(ValueError):
+        datacollection.extract_username(user_url)
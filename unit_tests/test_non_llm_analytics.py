@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+
+import pytest
+
+from reddit_persona.non_llm_analytics import NonLLMAnalysis, _MBTI_TRAITS, _window_starts
+
+
+def tokenizer_scores(text):
+    # Per-trait counts from the original word tokenizer, which only ever matched single words
+    word_counts = Counter(re.findall(r'\w+', text.lower()))
+    return {trait: sum(word_counts.get(keyword, 0) for keyword in keywords) for trait, keywords in _MBTI_TRAITS.items()}
+
+
+def pattern_scores(text):
+    scores = NonLLMAnalysis(reddit_data={}).analyze_mbtitext(text)[0]['scores']
+    return {
+        'E vs I': scores['E vs I'],
+        'S vs N': scores['S vs N'],
+        'T vs F': scores['T vs F'],
+        'J vs P': scores['J vs P']
+    }
+
+
+def dimension_scores(counts):
+    return {
+        'E vs I': counts['E'] - counts['I'],
+        'S vs N': counts['S'] - counts['N'],
+        'T vs F': counts['T'] - counts['F'],
+        'J vs P': counts['J'] - counts['P']
+    }
+
+
+@pytest.mark.parametrize("text", [
+    "I love a party with friends, but some days I stay quiet and alone.",
+    "FACTS, details and logic! Feelings? Organized, structured, planning... chill vibe.",
+    "Curious, creative and innovative ideas about the future; a fair debate over evidence.",
+    ""
+])
+def test_single_word_keywords_match_the_word_tokenizer(text):
+    assert pattern_scores(text) == dimension_scores(tokenizer_scores(text))
+
+
+def test_phrases_match_across_any_whitespace():
+    text = "I just go with\nthe flow, always last  minute and laid\tback."
+
+    assert pattern_scores(text)['J vs P'] == -3
+    # The word tokenizer never saw any of these phrases
+    assert tokenizer_scores(text)['P'] == 0
+
+
+def test_hyphenated_keywords_count_once():
+    # The word tokenizer split "open-ended" and counted "open" for P
+    assert pattern_scores("an open-ended question")['J vs P'] == -1
+    assert pattern_scores("a hands-on person")['S vs N'] == 1
+    assert pattern_scores("big-picture thinking")['S vs N'] == -1
+    assert pattern_scores("opened reopen")['J vs P'] == 0
+
+
+@pytest.mark.parametrize("n_tokens", [0, 1, 509, 510])
+def test_short_text_is_one_window(n_tokens):
+    assert _window_starts(n_tokens, window=510, stride=64) == [0]
+
+
+@pytest.mark.parametrize("n_tokens", [511, 956, 957, 2000, 10000])
+def test_windows_are_full_length_and_cover_the_text(n_tokens):
+    window, stride = 510, 64
+    starts = _window_starts(n_tokens, window, stride)
+
+    assert starts[0] == 0
+    # Every window is full length, the last one ends at the final token
+    assert starts[-1] == n_tokens - window
+    for previous, start in zip(starts, starts[1:]):
+        # Consecutive windows overlap by at least `stride` tokens, so no token is skipped
+        assert 0 < start - previous <= window - stride
+
+
+def test_last_window_is_end_aligned():
+    # A 511 token text used to end with a 65 token window holding one new token
+    assert _window_starts(511, window=510, stride=64) == [0, 1]
+
+
+def test_window_count_is_capped():
+    starts = _window_starts(100000, window=510, stride=64, max_windows=8)
+
+    assert len(starts) == 8
+    assert starts[0] == 0
+    assert starts[-1] == 100000 - 510
+    assert starts == sorted(set(starts))
+    assert _window_starts(100000, window=510, stride=64, max_windows=1) == [0]
+
+
+def emotion_analysis(scores_by_text, labels):
+    reddit_data = {
+        'user_info': {'link_karma': 0, 'comment_karma': 0},
+        'posts': [{'post_info': {'body': text, 'title': ''}, 'subreddit': 'python'} for text in scores_by_text],
+        'comments': [],
+        'subreddits_master': {'python': {'interactions_count': len(scores_by_text)}}
+    }
+    analysis = NonLLMAnalysis(reddit_data=reddit_data)
+
+    def classifier(texts, batch_size=32, truncation=True):
+        return [[{'label': label, 'score': score} for label, score in scores_by_text[text].items()] for text in texts]
+
+    analysis.emotion_classifier = classifier
+    analysis.emotion_labels = labels
+    return analysis.emotion_detections()[1]['python']
+
+
+def test_top_emotion_uses_the_model_labels():
+    summary = emotion_analysis({
+        'a': {'calm': 0.9, 'angry': 0.1},
+        'b': {'calm': 0.2, 'angry': 0.8},
+        'c': {'calm': 0.3, 'angry': 0.7},
+    }, labels=['calm', 'angry'])
+
+    assert summary['most_common_top_emotion'] == 'angry'
+
+
+def test_unknown_top_emotion_is_skipped():
+    summary = emotion_analysis({
+        'a': {'LABEL_7': 0.9, 'joy': 0.1},
+        'b': {'LABEL_7': 0.6, 'joy': 0.4},
+    }, labels=['sadness', 'joy'])
+
+    assert summary['most_common_top_emotion'] is None
+    assert summary['average_emotions'] == {'LABEL_7': 0.75, 'joy': 0.25}